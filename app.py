@@ -1,21 +1,351 @@
-from flask import Flask, jsonify, request
+# Monkey-patch before anything else is imported so psycopg2 waits
+# cooperatively under gevent workers: one process can then multiplex many
+# in-flight PG queries instead of blocking a thread per request.
+from gevent import monkey; monkey.patch_all()
+from psycogreen.gevent import patch_psycopg; patch_psycopg()
+
+from flask import Flask, jsonify, request, Response, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import orjson
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import sql
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor, execute_values
+import base64
+import csv
+import functools
+import io
 import os
-from datetime import datetime
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from cachetools import TTLCache
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, which serializes the dict-of-rows
+    payloads these endpoints return several times faster than stdlib json.
+    Datetimes and other non-native types fall back to str()."""
+
+    option = orjson.OPT_NAIVE_UTC
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand the orjson bytes straight to the response instead of
+        # round-tripping through a Python str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=str, option=self.option),
+            mimetype='application/json'
+        )
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
-def get_db():
-    return psycopg2.connect(
-        host=os.environ.get('DB_HOST'),
-        database=os.environ.get('DB_NAME'),
-        user=os.environ.get('DB_USER'),
-        password=os.environ.get('DB_PASSWORD'),
-        port=5432
-    )
+# Tables the /table endpoints may touch. A module-level frozenset gives O(1)
+# membership checks without rebuilding a list on every request.
+ALLOWED_TABLES = frozenset({
+    'lab_tests', 'medicines', 'prescription', 'vitals',
+    'medical_history', 'patients_registration',
+    'chat_history', 'image_analysis'
+})
+
+# Columns returned by GET /table/<table_name>. Pruning to an explicit list
+# cuts bytes off the wire and dict/JSON construction work per row. Tables
+# without an entry here (their schemas live outside this app) still get
+# SELECT *.
+TABLE_COLUMNS = {
+    'chat_history': [
+        'chat_id', 'session_id', 'patient_id', 'prompt', 'response', 'timestamp'
+    ],
+    'image_analysis': [
+        'analysis_id', 'patient_id', 'session_id', 'image_type',
+        'original_image_url', 'segmented_image_url', 'description', 'timestamp'
+    ],
+}
+
+# Primary key column per table, used for keyset pagination in get_table.
+# Only the tables whose schemas this service owns are listed; everything
+# else gets its key resolved from the catalog by _key_for() rather than
+# guessed at.
+TABLE_KEYS = {
+    'chat_history': 'chat_id',
+    'image_analysis': 'analysis_id',
+}
+
+# Server-side cursor batch size per table, sized by expected row width:
+# chat_history rows are short text, image_analysis rows carry long URLs
+# and descriptions. Too small means a round trip per few rows; too large
+# buffers more than a request needs.
+ITERSIZE = {
+    'chat_history': 5000,
+    'image_analysis': 500,
+}
+
+# Read-mostly tables whose GET responses can be served from an in-process
+# TTL cache. chat_history and image_analysis are write-heavy (and stream),
+# so they are never cached.
+CACHED_TABLES = ALLOWED_TABLES - {'chat_history', 'image_analysis'}
+
+table_cache = TTLCache(maxsize=64, ttl=30)
+table_cache_lock = Lock()
+
+def invalidate_table_cache(table_name):
+    """Drop all cached GET responses for a table after a write to it."""
+    with table_cache_lock:
+        for key in [k for k in table_cache if k[0] == table_name]:
+            del table_cache[key]
+
+# Batches at least this large go through COPY FROM STDIN in the bulk
+# endpoint; smaller ones stick with execute_values, where COPY's setup
+# cost is not worth it.
+BULK_COPY_THRESHOLD = 200
+
+# Cap on the number of values a single list filter may carry in a DELETE
+MAX_DELETE_LIST = 1000
+
+# Pagination bounds for GET /table/<name>: every request gets a LIMIT so a
+# growing table can never turn a GET into an unbounded full-table scan
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(key):
+    """Opaque keyset cursor: the last row's key, base64-wrapped."""
+    return base64.urlsafe_b64encode(app.json.dumps(key).encode()).decode()
+
+def decode_cursor(token):
+    return app.json.loads(base64.urlsafe_b64decode(token.encode()))
+
+# Process-wide pool: connections are established once and reused, so hot
+# requests pay a single query round trip instead of a full TCP+auth handshake.
+# minconn equals maxconn because psycopg2 closes any returned connection
+# beyond minconn idle ones - a smaller minconn would churn connections (and
+# their per-connection PREPAREs) under any real concurrency.
+pg_pool = ThreadedConnectionPool(
+    minconn=20,
+    maxconn=20,
+    host=os.environ.get('DB_HOST'),
+    database=os.environ.get('DB_NAME'),
+    user=os.environ.get('DB_USER'),
+    password=os.environ.get('DB_PASSWORD'),
+    port=5432
+)
+
+# How long a checkout may wait for a free connection before giving up
+POOL_WAIT_TIMEOUT = 5.0
+POOL_WAIT_INTERVAL = 0.05
+
+def pool_getconn():
+    """getconn with a bounded wait.
+
+    psycopg2's pool raises PoolError immediately when all connections are
+    checked out; under a burst that would turn transient contention into
+    errors. Briefly queue (the sleep yields under gevent) and only fail if
+    the pool stays exhausted past POOL_WAIT_TIMEOUT.
+    """
+    deadline = time.monotonic() + POOL_WAIT_TIMEOUT
+    while True:
+        try:
+            return pg_pool.getconn()
+        except PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(POOL_WAIT_INTERVAL)
+
+@contextmanager
+def db_cursor(cursor_factory=RealDictCursor):
+    """Check a connection out of the pool and yield (conn, cur).
+
+    Commits on success, rolls back on error, and always returns the
+    connection to the pool. Connections go back without any DISCARD/RESET
+    round trip: every checkout ends with an explicit commit or rollback
+    (or runs in autocommit), so there is no session state to scrub.
+    """
+    conn = pool_getconn()
+    try:
+        cur = conn.cursor(cursor_factory=cursor_factory)
+        try:
+            yield conn, cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    finally:
+        pg_pool.putconn(conn)
+
+@contextmanager
+def db_cursor_autocommit(cursor_factory=RealDictCursor):
+    """Pool checkout for single-statement and read-only endpoints.
+
+    With autocommit on, the statement commits itself as it runs: there is
+    no explicit BEGIN/COMMIT exchange, and a DELETE that matches nothing
+    never pays commit overhead at all. SELECT-only handlers use this too,
+    skipping transaction setup entirely. (The session is deliberately not
+    marked READ ONLY server-side: the pool is shared with write handlers,
+    and undoing that marker on putconn would cost the very RESET statement
+    this path avoids.)
+    """
+    conn = pool_getconn()
+    try:
+        conn.autocommit = True
+        cur = conn.cursor(cursor_factory=cursor_factory)
+        try:
+            yield conn, cur
+        finally:
+            cur.close()
+            conn.autocommit = False
+    finally:
+        pg_pool.putconn(conn)
+
+# Server-side prepared statements for the hot insert paths. PREPARE runs
+# once per pooled connection; after that every insert is an EXECUTE that
+# reuses the cached plan instead of re-parsing the statement text.
+PREPARE_HOT_INSERTS = """
+    PREPARE ins_chat (text, text, text, text) AS
+        INSERT INTO chat_history (session_id, patient_id, prompt, response, timestamp)
+        VALUES ($1, $2, $3, $4, NOW())
+        RETURNING chat_id;
+    PREPARE ins_image (text, text, text, text, text, double precision) AS
+        INSERT INTO image_analysis (
+            patient_id, image_type, original_image_url,
+            segmented_image_url, description, timestamp
+        )
+        VALUES ($1, $2, $3, $4, $5, COALESCE(to_timestamp($6), CURRENT_TIMESTAMP))
+        RETURNING analysis_id;
+"""
+
+# Connections that have already run PREPARE_HOT_INSERTS; entries vanish
+# with the connection itself
+_prepared_conns = WeakKeyDictionary()
+
+def ensure_prepared(conn, cur):
+    """Run PREPARE_HOT_INSERTS once for this pooled connection."""
+    if conn not in _prepared_conns:
+        cur.execute(PREPARE_HOT_INSERTS)
+        _prepared_conns[conn] = True
+
+@functools.lru_cache(maxsize=None)
+def _schema_for(table_names):
+    """Column metadata for one or more tables, cached per process.
+
+    Takes a tuple of table names and fetches them all in a single
+    information_schema query, so a cold lookup costs one round trip
+    regardless of how many tables are asked for. Schema only changes when
+    migrate_database runs, which clears this cache.
+    """
+    with db_cursor_autocommit(cursor_factory=None) as (conn, cur):
+        cur.execute("""
+            SELECT table_name, column_name, data_type, is_nullable
+            FROM information_schema.columns
+            WHERE table_name IN %s
+            ORDER BY table_name, ordinal_position
+        """, (table_names,))
+        schemas = {name: [] for name in table_names}
+        for tbl, col, dtype, nullable in cur.fetchall():
+            schemas[tbl].append({"name": col, "type": dtype, "nullable": nullable})
+        return schemas
+
+@functools.lru_cache(maxsize=None)
+def _key_for(table_name):
+    """Keyset column for a table, cached per process.
+
+    Returns the statically known key for tables this service owns, and
+    otherwise resolves the table's primary key from the catalog instead of
+    guessing at column names for schemas managed elsewhere. Returns None
+    when there is no single-column primary key to order by.
+    migrate_database clears this cache alongside _schema_for's.
+    """
+    known = TABLE_KEYS.get(table_name)
+    if known:
+        return known
+    with db_cursor_autocommit(cursor_factory=None) as (conn, cur):
+        cur.execute("""
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a
+              ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+        """, (table_name,))
+        pk_cols = cur.fetchall()
+    return pk_cols[0][0] if len(pk_cols) == 1 else None
+
+def open_table_stream(table_name, select_list, key_column, after_id, limit):
+    """Check out a connection and DECLARE the server-side cursor for a page.
+
+    Runs in the handler, before any response bytes are committed, so pool
+    exhaustion, a bad ?after= value, or any SQL error still surfaces as a
+    normal JSON error response. Returns (conn, cur) with the query already
+    executed; stream_rows() takes over from there.
+    """
+    query = sql.SQL("SELECT {} FROM {}").format(select_list, sql.Identifier(table_name))
+    params = []
+    if after_id is not None:
+        query = sql.SQL("{} WHERE {} > %s").format(query, sql.Identifier(key_column))
+        params.append(after_id)
+    query = sql.SQL("{} ORDER BY {}").format(query, sql.Identifier(key_column))
+    if limit is not None:
+        query = sql.SQL("{} LIMIT %s").format(query)
+        params.append(limit)
+
+    conn = pool_getconn()
+    try:
+        cur = conn.cursor(name='stream_' + table_name)
+        cur.itersize = ITERSIZE.get(table_name, 1000)
+        cur.execute(query, params)
+        return conn, cur
+    except Exception:
+        conn.rollback()
+        pg_pool.putconn(conn)
+        raise
+
+def stream_rows(conn, cur, table_name, key_column, limit):
+    """Stream one page of a table as a JSON document.
+
+    Rows arrive from the already-open named cursor in batches instead of
+    one big fetchall() - memory stays constant and time-to-first-byte is
+    O(page), not O(table). When a full page comes back, the last row's key
+    is emitted as an opaque next_cursor token for the client to pass back
+    as ?after=. Always commits/rolls back and returns the connection.
+    """
+    try:
+        try:
+            # Plain tuple rows + one dict(zip(...)) per row beat RealDictCursor's
+            # per-field name lookups on wide result sets.
+            cols = [d.name for d in cur.description]
+            key_index = cols.index(key_column)
+
+            yield '{"table": %s, "data": [' % app.json.dumps(table_name)
+            count = 0
+            last_key = None
+            for row in cur:
+                if count:
+                    yield ', '
+                yield app.json.dumps(dict(zip(cols, row)))
+                last_key = row[key_index]
+                count += 1
+            next_cursor = encode_cursor(last_key) if count == limit else None
+            yield '], "count": %d, "next_cursor": %s}' % (
+                count, app.json.dumps(next_cursor)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    finally:
+        pg_pool.putconn(conn)
 
 # ✅ ADD ROOT ENDPOINT
 @app.route('/', methods=['GET'])
@@ -45,28 +375,85 @@ def home():
 def get_table(table_name):
     """GET request to view all records in a table"""
     
-    allowed_tables = [
-        'lab_tests', 'medicines', 'prescription', 'vitals', 
-        'medical_history', 'patients_registration',
-        'chat_history', 'image_analysis'
-    ]
-    
-    if table_name not in allowed_tables:
+    if table_name not in ALLOWED_TABLES:
         return jsonify({"error": "Invalid table name"}), 400
     
     try:
-        conn = get_db()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute(f"SELECT * FROM {table_name}")
-        records = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        return jsonify({
+        columns = TABLE_COLUMNS.get(table_name)
+        if columns:
+            select_list = sql.SQL(', ').join(sql.Identifier(c) for c in columns)
+        else:
+            select_list = sql.SQL('*')
+
+        # Pagination is mandatory: default page size if the client asks for
+        # nothing, hard cap if it asks for too much
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        key_column = _key_for(table_name)
+        after = request.args.get('after')
+        if after:
+            try:
+                after_id = decode_cursor(after)
+            except Exception:
+                return jsonify({"error": "Invalid cursor"}), 400
+        else:
+            # Legacy explicit keyset arg, kept for existing clients
+            after_id = request.args.get('after_id', type=int)
+
+        if table_name not in CACHED_TABLES:
+            conn, cur = open_table_stream(
+                table_name, select_list, key_column, after_id, limit
+            )
+            return Response(
+                stream_with_context(
+                    stream_rows(conn, cur, table_name, key_column, limit)
+                ),
+                mimetype='application/json'
+            )
+
+        cache_key = (table_name, tuple(sorted(request.args.items())))
+        with table_cache_lock:
+            cached = table_cache.get(cache_key)
+        if cached is not None:
+            return jsonify(cached)
+
+        # Buffered path for cacheable tables: same keyset semantics as the
+        # streaming path, so page content is deterministic and every row is
+        # reachable through next_cursor. If the catalog has no single-column
+        # primary key to order by, the page is best-effort with no cursor.
+        query = sql.SQL("SELECT {} FROM {}").format(
+            select_list, sql.Identifier(table_name)
+        )
+        params = []
+        if key_column:
+            if after_id is not None:
+                query = sql.SQL("{} WHERE {} > %s").format(query, sql.Identifier(key_column))
+                params.append(after_id)
+            query = sql.SQL("{} ORDER BY {}").format(query, sql.Identifier(key_column))
+        query = sql.SQL("{} LIMIT %s").format(query)
+        params.append(limit)
+
+        with db_cursor_autocommit(cursor_factory=None) as (conn, cur):
+            cur.execute(query, params)
+            cols = [d.name for d in cur.description]
+            records = [dict(zip(cols, row)) for row in cur.fetchall()]
+
+        next_cursor = (
+            encode_cursor(records[-1][key_column])
+            if key_column and len(records) == limit else None
+        )
+        payload = {
             "table": table_name,
             "count": len(records),
-            "data": records
-        })
+            "data": records,
+            "next_cursor": next_cursor
+        }
+
+        with table_cache_lock:
+            table_cache[cache_key] = payload
+
+        return jsonify(payload)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -76,13 +463,7 @@ def get_table(table_name):
 def insert_into_table(table_name):
     """POST request to insert a new record into a table"""
     
-    allowed_tables = [
-        'lab_tests', 'medicines', 'prescription', 'vitals', 
-        'medical_history', 'patients_registration',
-        'chat_history', 'image_analysis'
-    ]
-    
-    if table_name not in allowed_tables:
+    if table_name not in ALLOWED_TABLES:
         return jsonify({"error": "Invalid table name"}), 400
     
     try:
@@ -90,63 +471,93 @@ def insert_into_table(table_name):
         
         if not data:
             return jsonify({"error": "No data provided"}), 400
-        
-        conn = get_db()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if table_name == 'chat_history':
-            cur.execute("""
-                INSERT INTO chat_history (session_id, patient_id, prompt, response, timestamp)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING chat_id
-            """, (
-                data.get('session_id'),
-                data.get('patient_id'),
-                data.get('prompt'),
-                data.get('response'),
-                datetime.now()
-            ))
-            
-        elif table_name == 'image_analysis':
-            # ✅ UPDATED: Now handles all required fields
-            cur.execute("""
-                INSERT INTO image_analysis (
-                    patient_id, 
-                   
-                    image_type, 
-                    original_image_url,
-                    segmented_image_url, 
-                    description, 
-                    timestamp
-                )
-                VALUES (%s,  %s, %s, %s, %s, to_timestamp(%s))
-                RETURNING analysis_id
-            """, (
-                data.get('patient_id'),
-               
-                data.get('image_type', 'surgical_frame'),
-                data.get('original_image_url'),  # ✅ NEW
-                data.get('segmented_image_url'),
-                data.get('description'),
-                data.get('timestamp')  # ✅ CHANGED: Use timestamp from request
-            ))
-        
-        else:
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['%s'] * len(data))
-            values = tuple(data.values())
-            
-            cur.execute(
-                f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
-                values
+
+        # Batch mode: a JSON array inserts all rows in one round trip via
+        # execute_values instead of one INSERT per request.
+        if isinstance(data, list):
+            if not all(isinstance(row, dict) and row for row in data):
+                return jsonify({"error": "Batch insert expects a list of non-empty objects"}), 400
+
+            cols = sorted({key for row in data for key in row})
+            rows = [tuple(row.get(c) for c in cols) for row in data]
+
+            # Match the single-row timestamp contract: the server fills the
+            # insert time when the client omits the column, and provided
+            # image_analysis timestamps are epoch seconds that go through
+            # to_timestamp() (falling back to CURRENT_TIMESTAMP on null),
+            # exactly as ins_image does. One row in an array must produce
+            # the same data as the same row inserted on its own.
+            insert_cols = list(cols)
+            placeholders = ['%s'] * len(cols)
+            template = None
+            if table_name in ('chat_history', 'image_analysis') and 'timestamp' not in cols:
+                insert_cols.append('timestamp')
+                placeholders.append('NOW()')
+                template = '(' + ', '.join(placeholders) + ')'
+            elif table_name == 'image_analysis' and 'timestamp' in cols:
+                placeholders[cols.index('timestamp')] = \
+                    'COALESCE(to_timestamp(%s), CURRENT_TIMESTAMP)'
+                template = '(' + ', '.join(placeholders) + ')'
+
+            key_column = _key_for(table_name)
+            insert_query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                sql.Identifier(table_name),
+                sql.SQL(', ').join(sql.Identifier(c) for c in insert_cols)
             )
-        
-        conn.commit()
-        result = cur.fetchone() if cur.description else None
-        
-        cur.close()
-        conn.close()
-        
+            if key_column:
+                insert_query = sql.SQL("{} RETURNING {}").format(
+                    insert_query, sql.Identifier(key_column)
+                )
+
+            with db_cursor() as (conn, cur):
+                returned = execute_values(
+                    cur, insert_query, rows, template=template,
+                    page_size=500, fetch=bool(key_column)
+                )
+
+            invalidate_table_cache(table_name)
+            return jsonify({
+                "message": f"Inserted {len(rows)} record(s) into {table_name}",
+                "inserted_count": len(rows),
+                "inserted_ids": [r[key_column] for r in returned] if key_column else None
+            }), 201
+
+        with db_cursor() as (conn, cur):
+            if table_name == 'chat_history':
+                ensure_prepared(conn, cur)
+                cur.execute("EXECUTE ins_chat (%s, %s, %s, %s)", (
+                    data.get('session_id'),
+                    data.get('patient_id'),
+                    data.get('prompt'),
+                    data.get('response')
+                ))
+
+            elif table_name == 'image_analysis':
+                # ✅ UPDATED: Now handles all required fields
+                ensure_prepared(conn, cur)
+                cur.execute("EXECUTE ins_image (%s, %s, %s, %s, %s, %s)", (
+                    data.get('patient_id'),
+                    data.get('image_type', 'surgical_frame'),
+                    data.get('original_image_url'),  # ✅ NEW
+                    data.get('segmented_image_url'),
+                    data.get('description'),
+                    data.get('timestamp')  # ✅ CHANGED: Use timestamp from request
+                ))
+
+            else:
+                columns = sql.SQL(', ').join(sql.Identifier(k) for k in data)
+                placeholders = sql.SQL(', ').join(sql.Placeholder() for _ in data)
+
+                cur.execute(
+                    sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+                        sql.Identifier(table_name), columns, placeholders
+                    ),
+                    tuple(data.values())
+                )
+
+            result = cur.fetchone() if cur.description else None
+
+        invalidate_table_cache(table_name)
         return jsonify({
             "message": f"Record inserted into {table_name}",
             "result": result
@@ -156,18 +567,112 @@ def insert_into_table(table_name):
         return jsonify({"error": str(e)}), 500
 
 
+# Bulk insert: COPY FROM STDIN for large batches
+@app.route('/table/<table_name>/bulk', methods=['POST'])
+def bulk_insert_into_table(table_name):
+    """POST a large batch of rows (JSON array or NDJSON) into a table.
+
+    Batches of BULK_COPY_THRESHOLD rows or more are serialized to CSV and
+    fed to PostgreSQL via COPY FROM STDIN, which skips per-row parse/plan
+    and is by far the fastest ingest path. Smaller batches fall back to
+    execute_values.
+    """
+    if table_name not in ALLOWED_TABLES:
+        return jsonify({"error": "Invalid table name"}), 400
+
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            body = request.get_data(as_text=True)
+            data = [app.json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            data = request.get_json()
+
+        if not isinstance(data, list) or not data:
+            return jsonify({"error": "Bulk insert expects a non-empty JSON array or NDJSON body"}), 400
+        if not all(isinstance(row, dict) and row for row in data):
+            return jsonify({"error": "Bulk insert expects a list of non-empty objects"}), 400
+
+        cols = sorted({key for row in data for key in row})
+        rows = [tuple(row.get(c) for c in cols) for row in data]
+
+        with db_cursor(cursor_factory=None) as (conn, cur):
+            # Same timestamp contract as the INSERT paths: chat_history rows
+            # without a timestamp get the server's insert time, and provided
+            # image_analysis timestamps are epoch seconds. COPY can't embed
+            # expressions, so the values are materialized here - SELECT NOW()
+            # inside this transaction returns exactly what NOW() in an INSERT
+            # statement would. (image_analysis without a timestamp column
+            # falls through to its DEFAULT CURRENT_TIMESTAMP in both
+            # branches.)
+            needs_now = (
+                (table_name == 'chat_history' and 'timestamp' not in cols)
+                or (table_name == 'image_analysis' and 'timestamp' in cols)
+            )
+            if needs_now:
+                cur.execute("SELECT NOW()")
+                batch_now = cur.fetchone()[0]
+
+            if table_name == 'chat_history' and 'timestamp' not in cols:
+                cols = cols + ['timestamp']
+                rows = [row + (batch_now,) for row in rows]
+            elif table_name == 'image_analysis' and 'timestamp' in cols:
+                ts = cols.index('timestamp')
+                rows = [
+                    row[:ts] + (
+                        batch_now if row[ts] is None
+                        else datetime.fromtimestamp(float(row[ts]), tz=timezone.utc),
+                    ) + row[ts + 1:]
+                    for row in rows
+                ]
+
+            col_list = sql.SQL(', ').join(sql.Identifier(c) for c in cols)
+
+            if len(rows) >= BULK_COPY_THRESHOLD:
+                # Write None as an explicit \N sentinel and tell COPY so:
+                # csv.writer emits both None and '' as an unquoted empty
+                # field, and with the default NULL marker COPY would turn
+                # empty strings into NULLs - diverging from what the
+                # execute_values path below inserts.
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                for row in rows:
+                    writer.writerow(['\\N' if v is None else v for v in row])
+                buf.seek(0)
+                cur.copy_expert(
+                    sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')").format(
+                        sql.Identifier(table_name), col_list
+                    ),
+                    buf
+                )
+                method = 'copy'
+            else:
+                execute_values(
+                    cur,
+                    sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                        sql.Identifier(table_name), col_list
+                    ),
+                    rows,
+                    page_size=500
+                )
+                method = 'insert'
+
+        invalidate_table_cache(table_name)
+        return jsonify({
+            "message": f"Inserted {len(rows)} record(s) into {table_name}",
+            "inserted_count": len(rows),
+            "method": method
+        }), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # Endpoint 3: DELETE - Delete records from a table
 @app.route('/table/<table_name>', methods=['DELETE'])
 def delete_from_table(table_name):
     """DELETE request to delete records from a table"""
     
-    allowed_tables = [
-        'lab_tests', 'medicines', 'prescription', 'vitals', 
-        'medical_history', 'patients_registration',
-        'chat_history', 'image_analysis'
-    ]
-    
-    if table_name not in allowed_tables:
+    if table_name not in ALLOWED_TABLES:
         return jsonify({"error": "Invalid table name"}), 400
     
     try:
@@ -177,27 +682,35 @@ def delete_from_table(table_name):
         if not filters:
             return jsonify({"error": "No filters provided. Use ?chat_id=123 or send JSON body"}), 400
         
-        conn = get_db()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Build DELETE query with WHERE clause
-        where_conditions = []
+        # Build DELETE query with WHERE clause. A JSON list value becomes
+        # col = ANY(%s), so N rows are deleted in one round trip instead of
+        # N per-id requests.
+        conditions = []
         values = []
-        
+
         for key, value in filters.items():
-            where_conditions.append(f"{key} = %s")
+            if isinstance(value, list):
+                if not value:
+                    return jsonify({"error": f"Empty list for filter '{key}'"}), 400
+                if len(value) > MAX_DELETE_LIST:
+                    return jsonify({
+                        "error": f"Filter '{key}' exceeds {MAX_DELETE_LIST} values"
+                    }), 400
+                conditions.append(sql.SQL("{} = ANY(%s)").format(sql.Identifier(key)))
+            else:
+                conditions.append(sql.SQL("{} = %s").format(sql.Identifier(key)))
             values.append(value)
-        
-        where_clause = " AND ".join(where_conditions)
-        delete_query = f"DELETE FROM {table_name} WHERE {where_clause} RETURNING *"
-        
-        cur.execute(delete_query, tuple(values))
-        deleted_records = cur.fetchall()
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
+
+        delete_query = sql.SQL("DELETE FROM {} WHERE {} RETURNING *").format(
+            sql.Identifier(table_name), sql.SQL(' AND ').join(conditions)
+        )
+
+        with db_cursor(cursor_factory=None) as (conn, cur):
+            cur.execute(delete_query, tuple(values))
+            cols = [d.name for d in cur.description]
+            deleted_records = [dict(zip(cols, row)) for row in cur.fetchall()]
+
+        invalidate_table_cache(table_name)
         return jsonify({
             "message": f"Deleted {len(deleted_records)} record(s) from {table_name}",
             "deleted_count": len(deleted_records),
@@ -212,16 +725,15 @@ def delete_from_table(table_name):
 def delete_chat_by_id(chat_id):
     """DELETE a specific chat by chat_id"""
     try:
-        conn = get_db()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("DELETE FROM chat_history WHERE chat_id = %s RETURNING *", (chat_id,))
-        deleted = cur.fetchone()
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
+        with db_cursor_autocommit() as (conn, cur):
+            cur.execute("""
+                WITH d AS (
+                    DELETE FROM chat_history WHERE chat_id = %s RETURNING *
+                )
+                SELECT * FROM d
+            """, (chat_id,))
+            deleted = cur.fetchone()
+
         if deleted:
             return jsonify({
                 "message": f"Chat {chat_id} deleted successfully",
@@ -238,21 +750,35 @@ def delete_chat_by_id(chat_id):
 def delete_session_chats(session_id):
     """DELETE all chats from a specific session"""
     try:
-        conn = get_db()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("DELETE FROM chat_history WHERE session_id = %s RETURNING chat_id", (session_id,))
-        deleted = cur.fetchall()
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            "message": f"Deleted {len(deleted)} chat(s) from session {session_id}",
-            "deleted_count": len(deleted),
-            "deleted_chat_ids": [d['chat_id'] for d in deleted]
-        }), 200
+        want_ids = request.args.get('ids') == '1'
+
+        with db_cursor_autocommit(cursor_factory=None) as (conn, cur):
+            if want_ids:
+                cur.execute(
+                    "DELETE FROM chat_history WHERE session_id = %s RETURNING chat_id",
+                    (session_id,)
+                )
+                deleted_ids = [row[0] for row in cur.fetchall()]
+                deleted_count = len(deleted_ids)
+            else:
+                # Count server-side so thousands of ids are never shipped
+                # (or allocated) just to be thrown away
+                cur.execute("""
+                    WITH d AS (
+                        DELETE FROM chat_history WHERE session_id = %s RETURNING 1
+                    )
+                    SELECT COUNT(*) FROM d
+                """, (session_id,))
+                deleted_count = cur.fetchone()[0]
+
+        payload = {
+            "message": f"Deleted {deleted_count} chat(s) from session {session_id}",
+            "deleted_count": deleted_count
+        }
+        if want_ids:
+            payload["deleted_chat_ids"] = deleted_ids
+
+        return jsonify(payload), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -261,13 +787,11 @@ def delete_session_chats(session_id):
 def migrate_database():
     """Migrate ONLY image_analysis table - chat_history untouched"""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-        
-        print("Starting migration for image_analysis only...")
-        
-        # Migration SQL - ONLY for image_analysis
-        migration_sql = """
+        with db_cursor(cursor_factory=None) as (conn, cur):
+            print("Starting migration for image_analysis only...")
+
+            # Migration SQL - ONLY for image_analysis
+            migration_sql = """
         -- Drop and recreate image_analysis with all required fields
         DROP TABLE IF EXISTS image_analysis CASCADE;
         
@@ -282,50 +806,64 @@ def migrate_database():
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         
-        -- Create indexes for image_analysis only
-        CREATE INDEX idx_image_patient ON image_analysis(patient_id);
-        CREATE INDEX idx_image_session ON image_analysis(session_id);
-        CREATE INDEX idx_image_timestamp ON image_analysis(timestamp DESC);
-        """
-        
-        cur.execute(migration_sql)
-        conn.commit()
-        
-        print("Migration complete, verifying...")
-        
-        # Verify image_analysis structure
-        cur.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns 
-            WHERE table_name = 'image_analysis'
-            ORDER BY ordinal_position
-        """)
-        
-        image_columns = [
-            {"name": col[0], "type": col[1], "nullable": col[2]} 
-            for col in cur.fetchall()
-        ]
-        
-        # Check indexes for image_analysis
-        cur.execute("""
-            SELECT indexname
-            FROM pg_indexes
-            WHERE schemaname = 'public' 
-            AND tablename = 'image_analysis'
-            ORDER BY indexname
-        """)
-        
-        indexes = [idx[0] for idx in cur.fetchall()]
-        
-        cur.close()
-        conn.close()
-        
+            -- Create indexes for image_analysis only
+            CREATE INDEX idx_image_patient ON image_analysis(patient_id);
+            CREATE INDEX idx_image_session ON image_analysis(session_id);
+            CREATE INDEX idx_image_timestamp ON image_analysis(timestamp DESC);
+            """
+
+            verbose = request.args.get('verbose') == '1'
+            if verbose:
+                cur.execute(migration_sql)
+                conn.commit()
+
+                print("Migration complete, verifying...")
+
+                # Full index listing for the detailed response
+                cur.execute("""
+                    SELECT indexname
+                    FROM pg_indexes
+                    WHERE schemaname = 'public'
+                    AND tablename = 'image_analysis'
+                    ORDER BY indexname
+                """)
+                indexes = [idx[0] for idx in cur.fetchall()]
+            else:
+                # Send the whole DDL batch plus the verification probe as one
+                # multi-statement execute: everything travels in a single
+                # round trip (the closest psycopg2 gets to pipeline mode) and
+                # only the probe's result set comes back.
+                cur.execute(migration_sql + """
+                    SELECT to_regclass('public.image_analysis') IS NOT NULL,
+                           (SELECT COUNT(*) FROM pg_indexes
+                            WHERE schemaname = 'public'
+                            AND tablename = 'image_analysis');
+                """)
+                table_exists, index_count = cur.fetchone()
+
+                print("Migration complete, verifying...")
+
+        # The table was just recreated, so cached catalog metadata is stale
+        _schema_for.cache_clear()
+        _key_for.cache_clear()
+
+        if verbose:
+            image_columns = _schema_for(('image_analysis',))['image_analysis']
+            return jsonify({
+                "status": "success",
+                "message": "image_analysis table recreated successfully (chat_history unchanged)",
+                "image_analysis": {
+                    "columns": image_columns,
+                    "indexes": indexes
+                }
+            }), 200
+
         return jsonify({
             "status": "success",
             "message": "image_analysis table recreated successfully (chat_history unchanged)",
             "image_analysis": {
-                "columns": image_columns,
-                "indexes": indexes
+                "exists": table_exists,
+                "index_count": index_count
             }
         }), 200
         
@@ -340,54 +878,42 @@ def migrate_database():
 def verify_schema():
     """Verify current database schema"""
     try:
-        conn = get_db()
-        cur = conn.cursor()
-        
-        # Get image_analysis columns
-        cur.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns 
-            WHERE table_name = 'image_analysis'
-            ORDER BY ordinal_position
-        """)
-        
-        image_columns = cur.fetchall()
-        
-        # Get chat_history columns to verify it's untouched
-        cur.execute("""
-            SELECT column_name, data_type, is_nullable
-            FROM information_schema.columns 
-            WHERE table_name = 'chat_history'
-            ORDER BY ordinal_position
-        """)
-        
-        chat_columns = cur.fetchall()
-        
-        # Count records
-        cur.execute("SELECT COUNT(*) FROM image_analysis")
-        image_count = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM chat_history")
-        chat_count = cur.fetchone()[0]
-        
-        cur.close()
-        conn.close()
-        
+        # Column metadata for both tables comes from one cached catalog query
+        schemas = _schema_for(('image_analysis', 'chat_history'))
+        image_columns = schemas['image_analysis']
+        chat_columns = schemas['chat_history']
+
+        with db_cursor_autocommit(cursor_factory=None) as (conn, cur):
+            # Count both tables in a single round trip. Exact COUNT(*) is a
+            # full table scan, so by default report the planner's O(1)
+            # reltuples estimate; ?exact=1 restores the precise count.
+            exact = request.args.get('exact') == '1'
+            if exact:
+                cur.execute("""
+                    SELECT (SELECT COUNT(*) FROM image_analysis),
+                           (SELECT COUNT(*) FROM chat_history)
+                """)
+                image_count, chat_count = cur.fetchone()
+            else:
+                cur.execute("""
+                    SELECT relname, reltuples::bigint
+                    FROM pg_class
+                    WHERE relname IN ('image_analysis', 'chat_history')
+                """)
+                estimates = dict(cur.fetchall())
+                image_count = estimates.get('image_analysis', 0)
+                chat_count = estimates.get('chat_history', 0)
+
+        count_key = "record_count" if exact else "record_count_estimate"
         return jsonify({
             "tables": {
                 "image_analysis": {
-                    "columns": [
-                        {"name": col[0], "type": col[1], "nullable": col[2]} 
-                        for col in image_columns
-                    ],
-                    "record_count": image_count
+                    "columns": image_columns,
+                    count_key: image_count
                 },
                 "chat_history": {
-                    "columns": [
-                        {"name": col[0], "type": col[1], "nullable": col[2]} 
-                        for col in chat_columns
-                    ],
-                    "record_count": chat_count
+                    "columns": chat_columns,
+                    count_key: chat_count
                 }
             }
         }), 200